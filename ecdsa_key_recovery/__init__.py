@@ -10,17 +10,41 @@ from Crypto.PublicKey import DSA
 import Crypto.PublicKey.DSA
 import Crypto.PublicKey.ECC
 
+try:
+    import Cryptodome.PublicKey.DSA  # pycryptodomex
+except ImportError:
+    Cryptodome = Crypto
+
 import ecdsa
 from ecdsa import SigningKey
-from ecdsa.numbertheory import inverse_mod
+
+try:
+    import coincurve  # optional: libsecp256k1 bindings
+except ImportError:
+    coincurve = None
+
+try:
+    import gmpy2  # optional: GMP backed integers
+    mpz = gmpy2.mpz
+    INTEGER_TYPES = (int, gmpy2.mpz)
+except ImportError:
+    gmpy2 = None
+    mpz = int
+    INTEGER_TYPES = (int,)
 
 import logging
+import sys
+from typing import NamedTuple
 
 logger = logging.getLogger(__name__)
 
+# pow(a, -1, n) computes modular inverses since python 3.8 (ValueError before)
+POW_INVERSE = sys.version_info >= (3, 8)
+
 def inverse(a, n):
     """
-    Calculate the modular multiplicative inverse of a modulo n using the Extended Euclidean Algorithm.
+    Calculate the modular multiplicative inverse of a modulo n using the iterative
+    Extended Euclidean Algorithm.
     
     Args:
         a: The number to find the inverse of
@@ -32,31 +56,177 @@ def inverse(a, n):
     Raises:
         ValueError: If a and n are not coprime (no inverse exists)
     """
-    def extended_gcd(a, b):
-        if a == 0:
-            return b, 0, 1
-        gcd, x1, y1 = extended_gcd(b % a, a)
-        x = y1 - (b // a) * x1
-        y = x1
-        return gcd, x, y
-    
-    gcd, x, _ = extended_gcd(a, n)
-    if gcd != 1:
+    a %= n
+    # invariant: r0 = x0 * a (mod n), r1 = x1 * a (mod n)
+    r0, r1, x0, x1 = n, a, 0, 1
+    while r1:
+        q = r0 // r1
+        r0, r1 = r1, r0 - q * r1
+        x0, x1 = x1, x0 - q * x1
+    if r0 != 1:
         raise ValueError(f"No modular multiplicative inverse exists for {a} modulo {n}")
-    return x % n
+    return x0 % n
 
-def bytes_fromhex(str):
-    return bytes.fromhex(str)
+def modinv(a, n):
+    """
+    Calculate the modular multiplicative inverse of a modulo n, preferring GMP's
+    ``gmpy2.invert`` (if installed) and the builtin ``pow(a, -1, n)`` (Python >= 3.8)
+    over :func:`inverse`.
 
-def bignum_to_hex(val, nbits=256):
-    ret = hex((val + (1 << nbits)) % (1 << nbits)).rstrip("L").lstrip("0x")
-    if len(ret) % 2 == 1:
-        # even out hexstr
-        return "0" + ret
+    Raises:
+        ValueError: If a and n are not coprime (no inverse exists)
+    """
+    if gmpy2 is not None:
+        try:
+            return gmpy2.invert(a, n)
+        except ZeroDivisionError:
+            raise ValueError(f"No modular multiplicative inverse exists for {a} modulo {n}")
+    if POW_INVERSE:
+        return pow(a, -1, n)
+    return inverse(a, n)
+
+def batch_inverse(values, n):
+    """
+    Calculate the modular multiplicative inverses of all values modulo n with a single
+    inversion (Montgomery's trick): one :func:`modinv` plus 3*(N-1) multiplications.
+    Values that are zero modulo n map to 0.
+
+    Args:
+        values: The numbers to find the inverses of
+        n: The modulus
+
+    Returns:
+        list of the modular multiplicative inverses, in the order of values
+
+    Raises:
+        ValueError: If a non-zero value and n are not coprime (no inverse exists)
+    """
+    values = [v % n for v in values]
+    # prefix products of the non-zero values
+    prefix = []
+    acc = 1
+    for v in values:
+        if v:
+            acc = acc * v % n
+        prefix.append(acc)
+    acc_inv = modinv(acc, n)
+    # walk backwards peeling off one factor at a time
+    ret = [0] * len(values)
+    for i in range(len(values) - 1, -1, -1):
+        v = values[i]
+        if not v:
+            continue
+        ret[i] = acc_inv * (prefix[i - 1] if i else 1) % n
+        acc_inv = acc_inv * v % n
     return ret
 
-def to_dsakey(secret_key, _from=Crypto.PublicKey.DSA, _to=Crypto.PublicKey.DSA):
-    if _from == Cryptodome.PublicKey.DSA:
+bytes_fromhex = bytes.fromhex
+
+def bignum_to_hex(val, nbits=256):
+    # two's complement, zero padded to whole bytes
+    return format(val & ((1 << nbits) - 1), f"0{-(-nbits // 8) * 2}x")
+
+def _affine_add(P, Q, p, a):
+    """
+    Add two affine points (x, y) on y^2 = x^3 + a*x + b mod p. None is the point at infinity.
+    """
+    if P is None:
+        return Q
+    if Q is None:
+        return P
+    if P[0] == Q[0]:
+        if (P[1] + Q[1]) % p == 0:
+            return None
+        lam = (3 * P[0] * P[0] + a) * modinv(2 * P[1], p) % p
+    else:
+        lam = (Q[1] - P[1]) * modinv(Q[0] - P[0], p) % p
+    x = (lam * lam - P[0] - Q[0]) % p
+    return x, (lam * (P[0] - x) - P[1]) % p
+
+def _jacobian_add_affine(P, Q, p, a):
+    """
+    Add an affine point Q (x, y) to a Jacobian point P (X, Y, Z) without a modular inversion.
+    None is the point at infinity.
+    """
+    if Q is None:
+        return P
+    if P is None:
+        return Q[0], Q[1], 1
+    X1, Y1, Z1 = P
+    Z1Z1 = Z1 * Z1 % p
+    H = (Q[0] * Z1Z1 - X1) % p
+    R = (Q[1] * Z1 * Z1Z1 - Y1) % p
+    if not H:
+        if R:
+            return None  # P == -Q
+        # P == Q: doubling
+        if not Y1:
+            return None
+        YY = Y1 * Y1 % p
+        S = 4 * X1 * YY % p
+        M = (3 * X1 * X1 + a * Z1Z1 * Z1Z1) % p
+        X3 = (M * M - 2 * S) % p
+        return X3, (M * (S - X3) - 8 * YY * YY) % p, 2 * Y1 * Z1 % p
+    HH = H * H % p
+    HHH = H * HH % p
+    V = X1 * HH % p
+    X3 = (R * R - HHH - 2 * V) % p
+    return X3, (R * (V - X3) - Y1 * HHH) % p, Z1 * H % p
+
+_COMB_TABLES = {}
+
+def comb_table(curve, width=8):
+    """
+    Fixed-base comb table for the generator of curve: table[i][j] = (j << (i * width)) * G
+    as affine tuple(x, y). The table is built once per (curve, width) and holds
+    ceil(bits(n) / width) * 2^width points (width=8: 8192 points for a 256 bit curve).
+    :param curve: ecdsa curve
+    :param width: window width in bits
+    :return: list of rows of affine points
+    """
+    key = (curve.name, width)
+    table = _COMB_TABLES.get(key)
+    if table is None:
+        p, a = curve.curve.p(), curve.curve.a()
+        base = (curve.generator.x(), curve.generator.y())
+        table = []
+        for _ in range(-(-curve.order.bit_length() // width)):
+            row = [None, base]
+            for _ in range(2, 1 << width):
+                row.append(_affine_add(row[-1], base, p, a))
+            table.append(row)
+            base = _affine_add(row[-1], base, p, a)  # base << width
+        _COMB_TABLES[key] = table
+    return table
+
+def comb_mul(curve, d, width=8):
+    """
+    Scalar multiplication d*G using the fixed-base comb table: one mixed Jacobian/affine
+    addition per window, no doublings and a single modular inversion at the end.
+    :param curve: ecdsa curve
+    :param d: scalar
+    :param width: window width in bits
+    :return: tuple(x, y) affine coordinates of d*G or None for the point at infinity
+    """
+    table = comb_table(curve, width)
+    p, a = curve.curve.p(), curve.curve.a()
+    d %= curve.order
+    mask = (1 << width) - 1
+    acc = None
+    for row in table:
+        acc = _jacobian_add_affine(acc, row[d & mask], p, a)
+        d >>= width
+    if acc is None:
+        return None
+    X, Y, Z = acc
+    z_inv = modinv(Z, p)
+    z_inv2 = z_inv * z_inv % p
+    return int(X * z_inv2 % p), int(Y * z_inv2 * z_inv % p)
+
+def to_dsakey(secret_key, _to=Crypto.PublicKey.DSA):
+    # the source library is detected from the key:
+    # pycryptodome(x) keys keep their components in ._key, pycrypto keys in .key
+    if hasattr(secret_key, '_key'):
         return _to.construct((int(secret_key._key['y']),
                               int(secret_key._key['g']),
                               int(secret_key._key['p']),
@@ -72,26 +242,14 @@ def to_ecdsakey(secret_key, _from=ecdsa.SigningKey, _to=Crypto.PublicKey.ECC):
     # pointx, pointy, d
     return _to.import_key(secret_key.to_der())
 
-class SignatureParameter:
+class SignatureParameter(NamedTuple):
     """
     DSA signature parameters.
+    :param r: Signature Param r
+    :param s: Signature Param s
     """
-
-    def __init__(self, r, s):
-        """
-        :param r: Signature Param r
-        :param s: Signature Param s
-        """
-        self.r = r
-        self.s = s
-
-    @property
-    def tuple(self):
-        """
-        Signature parameter to tuple()
-        :return: tuple(r,s)
-        """
-        return self.r, self.s
+    r: int
+    s: int
 
 class RecoverableSignature:
     """
@@ -111,7 +269,7 @@ class RecoverableSignature:
         self.x = None
 
     def __repr__(self):
-        return f"<{self.__class__.__name__} 0x{hash(self):x} sig=({str(self.sig.r)[:10]}…, {str(self.sig.s)[:10]}…) public={'✔' if self.pubkey else '⨯'} private={'✔' if self.x else '⨯'}>"
+        return f"<{self.__class__.__name__} 0x{hash(self):x} sig=(0x{format(self.sig.r, 'x')[:10]}…, 0x{format(self.sig.s, 'x')[:10]}…) public={'✔' if self.pubkey else '⨯'} private={'✔' if self.x else '⨯'}>"
 
     def _load_signature(self, sig):
         if all(hasattr(sig, att) for att in ('r', 's')):
@@ -123,8 +281,8 @@ class RecoverableSignature:
             "Invalid Signature Format! - Expected tuple(long r,long s) or SignatureParamter(long r, long s)")
 
     def _load_hash(self, h):
-        if isinstance(h, int):
-            return h
+        if isinstance(h, INTEGER_TYPES):
+            return int(h)
         elif isinstance(h, (str, bytes)):
             return Crypto.Util.number.bytes_to_long(h)
 
@@ -157,12 +315,21 @@ class DsaSignature(RecoverableSignature):
     Implementation of a DSA Signature
     """
 
-    def __init__(self, sig, h, pubkey):
+    def __init__(self, sig, h, pubkey, verify=True):
+        """
+        :param sig: tuple(long r, long s)
+        :param h: bytestring message digest
+        :param pubkey: pubkey object
+        :param verify: check that sig verifies h. Pass False for bulk scanning of
+                       signatures from a trusted source (e.g. a blockchain) to skip one
+                       DSA verification per signature.
+        """
         super().__init__(sig, h, pubkey)
-        logger.debug("%r - check verifies.." % self)
-        # check sig verifies hash
-        assert self.pubkey.verify(self.h, self.sig.tuple)
-        logger.debug("%r - Signature is ok" % self)
+        if verify:
+            logger.debug("%r - check verifies..", self)
+            # check sig verifies hash
+            assert self.pubkey.verify(self.h, (self.sig.r, self.sig.s))
+            logger.debug("%r - Signature is ok", self)
 
     def _load_pubkey(self, pubkey):
         return pubkey
@@ -175,7 +342,7 @@ class DsaSignature(RecoverableSignature):
     def import_key(*args, **kwargs):
         # extern_key, passphrase=None
         key = Cryptodome.PublicKey.DSA.import_key(*args, **kwargs)
-        return to_dsakey(key, _from=Cryptodome.PublicKey.DSA, _to=Crypto.PublicKey.DSA)
+        return to_dsakey(key, _to=Crypto.PublicKey.DSA)
 
     @property
     def privkey(self):
@@ -190,25 +357,82 @@ class DsaSignature(RecoverableSignature):
                               self.pubkey.q,
                               self.x])
 
+    @staticmethod
+    def batch_recover(sigs_a, sigs_b):
+        """
+        PrivateKey recovery for many signature pairs with reused nonce *k* at once.
+        All inversions of pairs sharing the same *q* are done with a single modular inversion.
+        Pairs that cannot be recovered (e.g. the same message signed twice, s_a == s_b)
+        are skipped and keep x = None.
+        :param sigs_a: list of DsaSignature objects
+        :param sigs_b: list of DsaSignature objects, sigs_b[i] reused the nonce of sigs_a[i]
+        :return: sigs_a
+        """
+        assert len(sigs_a) == len(sigs_b)
+        groups = {}
+        for a, b in zip(sigs_a, sigs_b):
+            assert (a.pubkey.q == b.pubkey.q)
+            assert (a.sig.r == b.sig.r)  # reused *k* implies same *r*
+            groups.setdefault(a.pubkey.q, []).append((a, b))
+
+        for q, pairs in groups.items():
+            q = mpz(q)
+            s_diffs = [mpz(a.sig.s) - mpz(b.sig.s) for a, b in pairs]
+            # [1/((s_a - s_b)*r), ...], see recover_nonce_reuse()
+            invs = batch_inverse([s_diff * mpz(a.sig.r) for (a, _), s_diff in zip(pairs, s_diffs)], q)
+            for (a, b), s_diff, inv in zip(pairs, s_diffs, invs):
+                if not inv:
+                    continue  # (s_a - s_b)*r = 0 mod q: not invertible
+                h_a = mpz(a.h)
+                z = h_a - b.h
+                a.k = int(z * mpz(a.sig.r) * inv % q)
+                a.x = int((z * mpz(a.sig.s) - h_a * s_diff) * inv % q)
+        return sigs_a
+
     def recover_nonce_reuse(self, other):
         assert (self.pubkey.q == other.pubkey.q)
         assert (self.sig.r == other.sig.r)  # reused *k* implies same *r*
-        self.k = (self.h - other.h) * inverse(self.sig.s -
-                                              other.sig.s, self.pubkey.q) % self.pubkey.q
-        self.x = ((self.k * self.sig.s - self.h) *
-                  inverse(self.sig.r, self.pubkey.q)) % self.pubkey.q
+        q = mpz(self.pubkey.q)
+        r = mpz(self.sig.r)
+        s = mpz(self.sig.s)
+        s_diff = s - mpz(other.sig.s)
+        h = mpz(self.h)
+        z = h - other.h
+        # k = z/(s - s2) and x = (k*s - h)/r share the denominator (s - s2)*r: one inversion
+        inv = modinv(s_diff * r % q, q)
+        self.k = int(z * r * inv % q)
+        self.x = int((z * s - h * s_diff) * inv % q)
         return self
 
 class EcDsaSignature(RecoverableSignature):
-    def __init__(self, sig, h, pubkey, curve=ecdsa.SECP256k1):
+    # opt-in: use the fixed-base comb table (see comb_table()) for generator multiplications
+    use_comb_table = False
+
+    def __init__(self, sig, h, pubkey, curve=ecdsa.SECP256k1, verify=True):
+        """
+        :param sig: tuple(long r, long s)
+        :param h: bytestring message digest
+        :param pubkey: pubkey object
+        :param curve: ecdsa curve
+        :param verify: check that sig verifies h. Pass False for bulk scanning of
+                       signatures from a trusted source (e.g. a blockchain) to skip one
+                       ECDSA verification per signature.
+        """
         self.curve = curve  # must be set before __init__ calls __load_pubkey
         super().__init__(sig, h, pubkey)
         self.signingkey = None
         self.n = self.pubkey.generator.order()
 
-        logger.debug("%r - check verifies.." % self)
-        assert (self.pubkey.verifies(self.h, self.sig))
-        logger.debug("%r - Signature is ok" % self)
+        if verify:
+            logger.debug("%r - check verifies..", self)
+            assert (self.pubkey.verifies(self.h, self.sig))
+            logger.debug("%r - Signature is ok", self)
+
+        # static per signature, reused by every recover_nonce_reuse() call.
+        # r^-1 is inverted along with the nonce candidates of the first recovery.
+        self._r_inv = None
+        self._s = mpz(self.sig.s)
+        self._h = mpz(self.h)
 
     def _load_pubkey(self, pubkey):
         if isinstance(pubkey, ecdsa.ecdsa.Public_key):
@@ -233,14 +457,18 @@ class EcDsaSignature(RecoverableSignature):
         # key = Cryptodome.PublicKey.ECC.import_key(*args, **kwargs)
         # return to_ecdsakey(key, _from=Cryptodome.PublicKey.ECC, _to=ecdsa.SigningKey)
 
-        if encoded.startswith('-----'):
+        if isinstance(encoded, str):
+            if encoded.startswith('-----'):
+                return ecdsa.SigningKey.from_pem(encoded)
+            encoded = encoded.encode()
+        elif encoded[:5] == b'-----':
             return ecdsa.SigningKey.from_pem(encoded)
 
         # OpenSSH
         # if encoded.startswith(b('ecdsa-sha2-')):
         #    return _import_openssh(encoded)
         # DER
-        if ord(encoded[0]) == 0x30:
+        if encoded[:1] == b'\x30':
             return ecdsa.SigningKey.from_der(encoded)
         raise Exception("Invalid Format")
 
@@ -254,25 +482,97 @@ class EcDsaSignature(RecoverableSignature):
         assert self.signingkey
         return self.signingkey.privkey
 
+    @staticmethod
+    def batch_recover(sigs_a, sigs_b):
+        """
+        PrivateKey recovery for many signature pairs with reused nonce *k* at once.
+        The nonce candidates of all pairs on the same curve are inverted with a single
+        modular inversion. Pairs that cannot be recovered are skipped and keep x = None.
+        :param sigs_a: list of EcDsaSignature objects
+        :param sigs_b: list of EcDsaSignature objects, sigs_b[i] reused the nonce of sigs_a[i]
+        :return: sigs_a
+        """
+        assert len(sigs_a) == len(sigs_b)
+        groups = {}
+        for a, b in zip(sigs_a, sigs_b):
+            assert (a.n == b.n)
+            assert (a.sig.r == b.sig.r)  # reused *k* implies same *r*
+            groups.setdefault(a.curve.name, []).append((a, b))
+
+        for pairs in groups.values():
+            # [1/(s_a - s_b), 1/(s_a + s_b)(, 1/r_a if not cached yet), ...]
+            values = []
+            needs_r_inv = []
+            for a, b in pairs:
+                values.extend((a._s - b._s, a._s + b._s))
+                needs_r_inv.append(a._r_inv is None)
+                if needs_r_inv[-1]:
+                    values.append(a.sig.r)
+            invs = iter(batch_inverse(values, pairs[0][0].n))
+            for (a, b), needs in zip(pairs, needs_r_inv):
+                candidate_invs = (next(invs), next(invs))
+                if needs:
+                    a._r_inv = next(invs)
+                a._recover_nonce_reuse(b, candidate_invs)
+        return sigs_a
+
     def recover_nonce_reuse(self, other):
-        sig2 = other.sig  # rename it
-        h2 = other.h  # rename it
+        candidates = (self._s - other._s, self._s + other._s)
+        if self._r_inv is None:
+            # invert r together with the candidates: still a single inversion
+            self._r_inv, *candidate_invs = batch_inverse((self.sig.r,) + candidates, self.n)
+        else:
+            candidate_invs = batch_inverse(candidates, self.n)
+        assert self._recover_nonce_reuse(other, candidate_invs)  # could not recover private key
+        return self
+
+    def _recover_nonce_reuse(self, other, candidate_invs):
+        """
+        :param other: other object of same type
+        :param candidate_invs: inverses of the nonce candidates (s - s2, s + s2) modulo n
+        :return: True if the private key was recovered
+        """
         # precalculate static values
-        z = self.h - h2
-        r_inv = inverse_mod(self.sig.r, self.n)
+        n = self.n
+        r = self.sig.r
+        s = self._s
+        h = self._h
+        z = h - other._h
+        r_inv = self._r_inv
+        point = (self.pubkey.point.x(), self.pubkey.point.y())
+        mul_generator = self._mul_generator
         #
-        # try all candidates
+        # try all candidates: k = z / (s ± s2). The sign combinations (-s ± s2) only negate k,
+        # and d = (s*k - h)/r absorbs that sign because s carries it as well, so two
+        # candidates cover all four.
+        # the loop only touches locals; self is written on success only.
         #
-        for candidate in (self.sig.s - sig2.s,
-                          self.sig.s + sig2.s,
-                          -self.sig.s - sig2.s,
-                          -self.sig.s + sig2.s):
-            k = (z * inverse_mod(candidate, self.n)) % self.n
-            d = (((self.sig.s * k - self.h) % self.n) * r_inv) % self.n
-            signingkey = SigningKey.from_secret_exponent(d, curve=self.curve)
-            if signingkey.get_verifying_key().pubkey.verifies(self.h, self.sig):
-                self.signingkey = signingkey
-                self.k = k
-                self.x = d
-                return self
-        assert False  # could not recover private key
+        for candidate_inv in candidate_invs:
+            k = (z * candidate_inv) % n
+            # the nonce must reproduce r
+            if not k or mul_generator(k)[0] % n != r:
+                continue
+            d = (((s * k - h) % n) * r_inv) % n
+            # the recovered key must reproduce our public key; no need to verify the signature
+            if d and mul_generator(d) == point:
+                self.signingkey = SigningKey.from_secret_exponent(int(d), curve=self.curve)
+                self.k = int(k)
+                self.x = int(d)
+                return True
+        return False
+
+    def _mul_generator(self, k):
+        """
+        Scalar multiplication with the curve generator.
+        Uses libsecp256k1 (coincurve) for secp256k1 if available, otherwise the
+        comb table if use_comb_table is set.
+        :param k: scalar 0 < k < n
+        :return: tuple(x, y) affine coordinates of k*G
+        """
+        if coincurve is not None and self.curve == ecdsa.SECP256k1:
+            return coincurve.PublicKey.from_valid_secret(int(k).to_bytes(32, "big")).point()
+        if self.use_comb_table:
+            return comb_mul(self.curve, k)
+        # ecdsa flags curve generators for precomputation and keeps the tables on the point
+        point = self.curve.generator * k
+        return point.x(), point.y()
@@ -29,4 +29,6 @@ setup(
     install_requires=["pycryptodomex",
                       "pycrypto",
                       "ecdsa"],
+    extras_require={"secp256k1": ["coincurve"],
+                    "gmpy2": ["gmpy2"]},
 )